@@ -2,6 +2,7 @@
 #pragma once
 
 #include <openfhe.h>
+#include <chrono>
 #include <iostream>
 #include <vector>
 #include <random>
@@ -25,7 +26,8 @@ extern "C" {
 enum class MeasurementMode {
     LATENCY,
     DRAM,
-    PIN
+    PIN,
+    DRAM_PIN  // DRAM counters and PIN markers in a single run
 };
 
 // Simple command-line argument parser
@@ -69,6 +71,7 @@ public:
         std::string mode = getString("measure", "latency");
         if (mode == "dram") return MeasurementMode::DRAM;
         if (mode == "pin") return MeasurementMode::PIN;
+        if (mode == "dram+pin") return MeasurementMode::DRAM_PIN;
         return MeasurementMode::LATENCY;  // default
     }
 };
@@ -105,42 +108,64 @@ private:
     MeasurementMode mode;
     DRAMCounter dramCounter;
     bool dramInitialized = false;
+    std::chrono::steady_clock::time_point regionStart;
+    std::chrono::steady_clock::duration regionTime{};
+    
+    bool dramEnabled() const {
+        return mode == MeasurementMode::DRAM || mode == MeasurementMode::DRAM_PIN;
+    }
+    
+    bool pinEnabled() const {
+        return mode == MeasurementMode::PIN || mode == MeasurementMode::DRAM_PIN;
+    }
     
 public:
     MeasurementSystem(MeasurementMode m) : mode(m) {
-        if (mode == MeasurementMode::DRAM) {
+        if (dramEnabled()) {
             dramInitialized = dramCounter.init();
         }
     }
     
+    // The DRAM region doubles as the timed region in latency mode, so the
+    // reported time excludes process startup and context setup
     void startDRAM() {
-        if (mode == MeasurementMode::DRAM && dramInitialized) {
+        if (dramEnabled() && dramInitialized) {
             dramCounter.start();
         }
+        if (mode == MeasurementMode::LATENCY) {
+            regionStart = std::chrono::steady_clock::now();
+        }
     }
     
     void stopDRAM() {
-        if (mode == MeasurementMode::DRAM && dramInitialized) {
+        if (mode == MeasurementMode::LATENCY) {
+            regionTime = std::chrono::steady_clock::now() - regionStart;
+        }
+        if (dramEnabled() && dramInitialized) {
             dramCounter.stop();
         }
     }
     
     void startPIN() {
-        if (mode == MeasurementMode::PIN) {
+        if (pinEnabled()) {
             PIN_MARKER_START();
         }
     }
     
     void endPIN() {
-        if (mode == MeasurementMode::PIN) {
+        if (pinEnabled()) {
             PIN_MARKER_END();
         }
     }
     
     void printResults() {
-        if (mode == MeasurementMode::DRAM && dramInitialized) {
+        if (dramEnabled() && dramInitialized) {
             dramCounter.print_results();
         }
+        if (mode == MeasurementMode::LATENCY) {
+            auto us = std::chrono::duration_cast<std::chrono::microseconds>(regionTime);
+            std::cout << "ELAPSED_US=" << us.count() << std::endl;
+        }
     }
 };
 
@@ -151,8 +176,14 @@ private:
     
 public:
     TempDirectory() {
-        char tmpTemplate[] = "/tmp/openfhe_bench_XXXXXX";
-        char* tmpDir = mkdtemp(tmpTemplate);
+        // Honor TMPDIR so the runner can hand out a private scratch area
+        std::error_code ec;
+        std::filesystem::path base = std::filesystem::temp_directory_path(ec);
+        if (ec) {
+            base = "/tmp";
+        }
+        std::string tmpTemplate = (base / "openfhe_bench_XXXXXX").string();
+        char* tmpDir = mkdtemp(tmpTemplate.data());
         if (tmpDir) {
             path = std::string(tmpDir);
             std::filesystem::create_directories(path + "/data");
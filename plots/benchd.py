@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Long-lived benchmark driver reading JSON requests from stdin.
+
+Keeps one Benchmarker alive across requests, so the interpreter start-up,
+sudo probe, build cache and warm-up state are paid for once. Each input
+line is a JSON object and produces exactly one JSON line on stdout:
+
+    {"cmd": "run", "benchmark": "addition", "kwargs": {"ring_dim": 4096}}
+    {"cmd": "sweep", "benchmark": "rotation", "param_sets": [{...}, ...]}
+    {"cmd": "run_all", "benchmarks": ["addition", "rotation"], "kwargs": {...}}
+    {"cmd": "config", "kwargs": {"num_limbs": 4}}
+
+Failed requests are answered with {"error": "<message>"}. Anything else
+written to stdout, such as build and benchmark output in --debug mode,
+is redirected to stderr so it cannot corrupt the replies.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from benchmarker import Benchmarker
+
+
+def handle(b, request):
+    """Execute one request against the shared Benchmarker."""
+    if not isinstance(request, dict):
+        raise ValueError(f"Request must be a JSON object, got {type(request).__name__}")
+
+    cmd = request.get("cmd")
+    kwargs = request.get("kwargs", {})
+
+    if cmd == "run":
+        return b.run(request["benchmark"], **kwargs)
+    if cmd == "sweep":
+        return b.sweep(request["benchmark"], request["param_sets"], request.get("workers", 1))
+    if cmd == "run_all":
+        return b.run_all(request["benchmarks"], request.get("workers", 1), **kwargs)
+    if cmd == "config":
+        b.base_config.update(kwargs)
+        return b.base_config
+
+    raise ValueError(f"Unknown command: {cmd}")
+
+
+def main():
+    # Keep the real stdout for replies and send everything else to stderr,
+    # including output of child processes that inherit fd 1
+    sys.stdout.flush()
+    replies = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    b = Benchmarker(debug="--debug" in sys.argv[1:])
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            reply = handle(b, json.loads(line))
+        except (ValueError, KeyError, TypeError, OSError, RuntimeError,
+                subprocess.SubprocessError) as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(reply), file=replies, flush=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
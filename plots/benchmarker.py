@@ -5,16 +5,213 @@ Performance benchmarking framework for measuring execution metrics.
 Provides comprehensive performance analysis including:
 - Execution latency measurements
 - DRAM traffic analysis
-- Integer operation counting via Intel PIN
+- Integer operation counting via Intel PIN (or perf hardware counters)
 """
 
 import json
-import re
+import queue
 import os
+import shutil
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
 from pathlib import Path
-from statistics import mean, stdev
+from statistics import mean, median, stdev
+
+# Decodes the op-count JSON object wherever it starts, nested or not
+_JSON_DECODER = json.JSONDecoder()
+
+# Common options for every child process: benchmarks never read stdin,
+# and detaching it keeps sudo/PIN from grabbing the terminal. Python opens
+# its own descriptors non-inheritable, so close_fds is unnecessary, and
+# leaving it off lets subprocess launch through posix_spawn instead of
+# fork+exec for commands given by path.
+_SPAWN_KW = {"stdin": subprocess.DEVNULL, "close_fds": False}
+
+# Counters printed by the DRAM profiler; parsing stops once all are seen
+_DRAM_KEYS = frozenset(("DRAM_READ_BYTES", "DRAM_WRITE_BYTES", "DRAM_TOTAL_BYTES"))
+
+# Fewest timed runs before early_stop_cv may end a measurement
+_EARLY_STOP_MIN_RUNS = 3
+
+# Hardware events collected by the perf counter backend
+_PERF_EVENTS = ("instructions", "cycles")
+
+
+@lru_cache(maxsize=256)
+def _exists(path):
+    """Cached existence check; cleared whenever a build changes the tree."""
+    return os.path.exists(path)
+
+
+def _dram_parser(data):
+    """Return a line callback that records DRAM_* counters into data."""
+    def parse(line):
+        # Data lines are plain KEY=value on stdout; anything else is skipped,
+        # as is everything once the full set of counters has been read
+        if line.startswith(b"DRAM_") and not _DRAM_KEYS <= data.keys():
+            key, _, value = line.partition(b"=")
+            try:
+                data[key.decode()] = int(value)
+            except ValueError:
+                pass
+    return parse
+
+
+def _opcounts_collector(lines):
+    """Return a line callback that keeps only the lines of the op-count JSON."""
+    depth = 0
+    
+    def collect(line):
+        nonlocal depth
+        # Track brace depth so nested objects do not end the capture early
+        if (lines and depth > 0) or (not lines and b"{" in line):
+            lines.append(line)
+            depth += line.count(b"{") - line.count(b"}")
+    return collect
+
+
+def _decode_opcounts(lines):
+    """Decode the op-count JSON gathered by _opcounts_collector, or None."""
+    data = b"".join(lines)
+    start = data.find(b"{")
+    if start < 0:
+        return None
+    try:
+        return _JSON_DECODER.raw_decode(data[start:].decode())[0]
+    except ValueError:
+        return None
+
+
+def _refresh_sudo_ticket(stop, interval=60):
+    """Keep sudo's cached credentials fresh until stop is set or renewal fails."""
+    while not stop.wait(interval):
+        if subprocess.run(
+            ["sudo", "-n", "-v"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_SPAWN_KW
+        ).returncode != 0:
+            return
+
+
+def _release(scratch_dir, stop_refresh):
+    """Finalizer of a Benchmarker: remove its scratch area, end the sudo refresh."""
+    stop_refresh.set()
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def _signal_group(pgid, sig):
+    """Send sig to a process group, ignoring one that has already exited."""
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _parameter_error(params):
+    """Return why OpenFHE would reject a parameter set, or None if it is valid."""
+    ring_dim = params["ring_dim"]
+    if ring_dim < 16:
+        return f"Ring dimension must be at least 16, got {ring_dim}"
+    if ring_dim & (ring_dim - 1):
+        return f"Ring dimension must be a power of two, got {ring_dim}"
+    if params["num_limbs"] < 1:
+        return f"Number of limbs must be at least 1, got {params['num_limbs']}"
+    return None
+
+
+def _summary_stats(samples):
+    """Return (mean, stdev) of timing samples, or (None, None) if empty."""
+    if not samples:
+        return (None, None)
+    return (mean(samples), stdev(samples) if len(samples) > 1 else 0.0)
+
+
+def _robust_stats(samples):
+    """
+    Return (median, scaled MAD) of timing samples, or (None, None) if empty.
+    
+    The median absolute deviation is scaled by 1.4826 so it is comparable
+    to a standard deviation, but unlike mean/stdev neither figure is
+    dragged by a single run hit by page faults or a scheduler hiccup.
+    """
+    if not samples:
+        return (None, None)
+    mid = median(samples)
+    return (mid, 1.4826 * median(abs(t - mid) for t in samples))
+
+
+def _call_on_cpus(cpus, fn, *args):
+    """Call fn with the current thread (and the children it spawns) on cpus."""
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cpus)
+    try:
+        return fn(*args)
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+def _parse_cpu_list(text):
+    """Parse a kernel CPU list such as "2-5,8" into a sorted list of CPUs."""
+    cpus = []
+    for part in text.split(","):
+        if part.strip():
+            first, _, last = part.partition("-")
+            cpus.extend(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+@lru_cache(maxsize=1)
+def _isolated_cpus():
+    """Return the CPUs reserved with isolcpus= on the kernel command line."""
+    try:
+        with open("/sys/devices/system/cpu/isolated") as f:
+            return tuple(_parse_cpu_list(f.read()))
+    except (OSError, ValueError):
+        return ()
+
+
+def _cpu_slices(threads):
+    """
+    Split the CPUs for pinned runs into disjoint runs of threads.
+    
+    Single-threaded runs prefer cores isolated from the scheduler
+    (isolcpus=) that this process may use, since nothing else is placed
+    on them. Isolated cores are not load-balanced, so a multi-threaded
+    run spread over several of them could stack its threads on one core;
+    such runs use the CPUs available to this process instead.
+    """
+    allowed = os.sched_getaffinity(0)
+    isolated = [cpu for cpu in _isolated_cpus() if cpu in allowed]
+    cpus = isolated if threads == 1 and isolated else sorted(allowed)
+    size = max(1, threads)
+    return [cpus[i:i + size] for i in range(0, len(cpus) - size + 1, size)] or [cpus]
+
+
+def _latency(timing):
+    """
+    Pick the latency figure from a measure_timing result.
+    
+    Prefers the in-process region time and falls back to wall time for
+    binaries that do not report ELAPSED_US.
+    """
+    return timing["region"] if timing["region"][0] is not None else timing["wall"]
+
+
+def _format_arg_value(value):
+    """Render a parameter value the way the benchmark's ArgParser expects it."""
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return value
 
 
 class Benchmarker:
@@ -25,9 +222,30 @@ class Benchmarker:
     including timing, memory traffic, and instruction counts.
     """
     
-    def __init__(self, debug=False):
-        """Initialize the benchmarker with debug control."""
+    def __init__(self, debug=False, counter_backend="pin"):
+        """
+        Initialize the benchmarker.
+        
+        Args:
+            debug: If True, show build and benchmark output
+            counter_backend: "pin" for exact instrumented operation counts,
+                or "perf" for cheaper hardware-counter approximations
+        """
+        if counter_backend not in ("pin", "perf"):
+            raise ValueError(f"Unknown counter backend: {counter_backend}")
+        
         self._debug = debug
+        self.counter_backend = counter_backend
+        self._sudo_keepalive = None
+        # Whether sudo runs any command without a password, and otherwise
+        # which programs it was found to allow
+        self._sudo_any = False
+        self._sudo_allows = {}
+        self._stop_keepalive = threading.Event()
+        self._exe_cache = {}
+        self._warmed = set()
+        # CPUs this process may run on, which can be fewer than the machine has
+        self._ncpu = len(os.sched_getaffinity(0))
         self._setup_paths()
         self._setup_default_config()
     
@@ -40,8 +258,18 @@ class Benchmarker:
             self.repo_root = current_file.parent
         
         self.build_dir = self.repo_root / "build"
+        
+        # Private scratch area for the benchmarks' serialized ciphertexts,
+        # removed as a whole instead of scanning /tmp for leftovers; the
+        # same finalizer stops the sudo refresh thread
+        self.scratch_dir = Path(tempfile.mkdtemp(prefix="openfhe_bench_"))
+        weakref.finalize(self, _release, self.scratch_dir, self._stop_keepalive)
+        self._env = {**os.environ, "TMPDIR": str(self.scratch_dir)}
+        
         self.pin_path = Path("/opt/intel/pin/pin")
         self.pintool_path = Path("/opt/profiling-tools/lib/pintool.so")
+        # Seconds before an instrumented run is considered hung and stopped
+        self.pin_timeout = 600
     
     def _setup_default_config(self):
         """Set up the default configuration for all benchmarks."""
@@ -52,7 +280,14 @@ class Benchmarker:
             "matrix_dim": 128,
             "threads": 1,
             "timing_runs": 5,
+            "warmup_runs": 1,
+            "drop_caches": False,
+            "early_stop_cv": None,
             "check_security": False,
+            "single_pass": False,
+            "overlap_counters": False,
+            "pin_cpus": False,
+            "counters": True,
             "build": True,
             "debug": False,
         }
@@ -61,45 +296,90 @@ class Benchmarker:
         """
         Build a benchmark executable from source.
         
+        All examples are targets of one CMake tree under build/cmake,
+        configured once; building a benchmark only builds its target. The
+        executables themselves are still placed directly in build/. CMake
+        is skipped entirely when this session already built the benchmark
+        and neither its source nor utils.hpp has changed since.
+        
         Args:
             benchmark: Name of the benchmark to build
-            clean: If True, force a clean rebuild
+            clean: If True, force a clean rebuild of this benchmark only
             
         Returns:
             Path to the built executable
         """
-        self.build_dir.mkdir(exist_ok=True)
+        stamp = self._source_stamp(benchmark)
+        cached = self._exe_cache.get(benchmark)
+        if not clean and cached and cached[1] == stamp and _exists(str(cached[0])):
+            return cached[0]
         
-        # Optionally remove existing binary
+        tree = self.build_dir / "cmake"
+        tree.mkdir(parents=True, exist_ok=True)
+        
+        # A clean build removes only this target's binary and objects; the
+        # tree's global clean target would delete every other example too
         if clean:
             binary_path = self.build_dir / benchmark
-            if binary_path.exists():
+            if _exists(str(binary_path)):
                 binary_path.unlink()
+            shutil.rmtree(tree / "CMakeFiles" / f"{benchmark}.dir", ignore_errors=True)
         
-        subprocess.run(
-            [
+        # New example files are picked up by the glob at build time, so the
+        # tree only needs configuring once
+        configured = _exists(str(tree / "CMakeCache.txt"))
+        if clean or not configured:
+            configure_cmd = [
                 "cmake",
                 "-S", str(self.repo_root),
-                "-B", str(self.build_dir),
-                f"-DBENCH_SOURCE=examples/{benchmark}.cpp",
+                "-B", str(tree),
+                f"-DCMAKE_RUNTIME_OUTPUT_DIRECTORY={self.build_dir}",
                 "-DCMAKE_BUILD_TYPE=Release"
-            ],
-            check=True,
-            capture_output=not self._debug
-        )
+            ]
+            if shutil.which("ccache"):
+                configure_cmd.append("-DCMAKE_CXX_COMPILER_LAUNCHER=ccache")
+            # The generator can only be chosen for a fresh build tree
+            if shutil.which("ninja") and not configured:
+                configure_cmd.extend(["-G", "Ninja"])
+            
+            subprocess.run(
+                configure_cmd, check=True, capture_output=not self._debug, **_SPAWN_KW
+            )
         
-        # Add --clean-first to force rebuild
         build_cmd = [
             "cmake",
-            "--build", str(self.build_dir),
-            "-j", str(os.cpu_count())
+            "--build", str(tree),
+            "--target", benchmark,
+            "--parallel", str(self._ncpu)
         ]
-        if clean:
-            build_cmd.insert(2, "--clean-first")
         
-        subprocess.run(build_cmd, check=True, capture_output=not self._debug)
+        subprocess.run(build_cmd, check=True, capture_output=not self._debug, **_SPAWN_KW)
+        _exists.cache_clear()
+        self._warmed.clear()
+        
+        target = self.build_dir / benchmark
+        self._exe_cache[benchmark] = (target, stamp)
+        return target
+    
+    def _source_stamp(self, benchmark):
+        """
+        Fingerprint the sources a benchmark executable is built from.
         
-        return self.build_dir / benchmark
+        Args:
+            benchmark: Name of the benchmark
+            
+        Returns:
+            Tuple of (mtime_ns, size) pairs for the benchmark source and
+            utils.hpp, with None for files that do not exist
+        """
+        stamp = []
+        for path in (f"examples/{benchmark}.cpp", "examples/utils.hpp"):
+            try:
+                st = os.stat(self.repo_root / path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
     
     def measure_latency(self, target, args, runs=3):
         """
@@ -113,21 +393,115 @@ class Benchmarker:
         Returns:
             Tuple of (mean_time, standard_deviation) or (None, None) on failure
         """
+        return _latency(self.measure_timing(target, args, runs))
+    
+    def measure_timing(self, target, args, runs=3, warmup_runs=0, drop_caches=False,
+                       early_stop_cv=None):
+        """
+        Measure region, wall-clock and CPU time over multiple runs.
+        
+        Region time is reported by the benchmark itself (ELAPSED_US) and
+        covers only the measured region, excluding process startup and
+        OpenFHE context setup. Wall time is measured around the whole
+        process. CPU time is the user plus system time from the child's
+        rusage, summed over all threads.
+        
+        Args:
+            target: Path to the executable
+            args: Command line arguments
+            runs: Number of timing runs to perform
+            warmup_runs: Untimed runs to perform first; skipped if this
+                configuration was already warmed up in this session
+            drop_caches: If True, precede every timed run with a cold run
+                started right after dropping the page cache (requires
+                privileges). The benchmark re-reads the ciphertexts it has
+                just written, so only the cold wall time, which includes
+                loading the executable and libraries, differs noticeably
+            early_stop_cv: If set, runs becomes an upper bound and timing
+                stops once at least three latency samples have a
+                coefficient of variation below this value
+            
+        Returns:
+            Dictionary with "region", "wall" and "cpu" tuples of
+            (mean_time, standard_deviation), plus a "median" tuple of
+            (median_time, scaled_mad) over the latency samples; each is
+            (None, None) on failure. "samples" holds the raw latency
+            samples in seconds. "cold_wall" holds the wall time of the
+            cold runs, which is (None, None) unless drop_caches is set.
+        """
+        if drop_caches and not self._can_elevate("sh"):
+            raise RuntimeError("drop_caches requires root or non-interactive sudo")
+        
         cmd = [str(target), *args, "--measure=latency"]
         
-        times = []
+        # Prime the page cache and CPU clocks once per configuration,
+        # not before every measurement of it
+        key = tuple(cmd)
+        if warmup_runs > 0 and key not in self._warmed:
+            self._warmed.add(key)
+            for _ in range(warmup_runs):
+                subprocess.run(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    env=self._env,
+                    **_SPAWN_KW
+                )
+        
+        region_times = []
+        wall_times = []
+        cpu_times = []
+        cold_wall_times = []
+        
+        def parse(line):
+            if line.startswith(b"ELAPSED_US="):
+                region_times.append(int(line[len(b"ELAPSED_US="):]) / 1e6)
+        
         for _ in range(runs):
+            if drop_caches:
+                # The cold run also primes the cache for the warm run after it
+                self._drop_caches()
+                start = time.perf_counter()
+                returncode, _ = self._run_streaming(cmd, lambda line: None, env=self._env)
+                if returncode == 0:
+                    cold_wall_times.append(time.perf_counter() - start)
+            
+            reported = len(region_times)
             start = time.perf_counter()
-            result = subprocess.run(cmd, capture_output=not self._debug)
+            returncode, usage = self._run_streaming(cmd, parse, env=self._env)
+            elapsed = time.perf_counter() - start
             
-            if result.returncode == 0:
-                elapsed = time.perf_counter() - start
-                times.append(elapsed)
-        
-        if not times:
-            return (None, None)
+            if returncode == 0:
+                wall_times.append(elapsed)
+                cpu_times.append(usage.ru_utime + usage.ru_stime)
+            else:
+                del region_times[reported:]
+                continue
             
-        return (mean(times), stdev(times) if len(times) > 1 else 0.0)
+            # Judge the same series that is reported as the latency
+            samples = region_times or wall_times
+            if (early_stop_cv is not None and len(samples) >= _EARLY_STOP_MIN_RUNS
+                    and stdev(samples) < early_stop_cv * mean(samples)):
+                break
+        
+        return {
+            "region": _summary_stats(region_times),
+            "wall": _summary_stats(wall_times),
+            "cpu": _summary_stats(cpu_times),
+            "median": _robust_stats(region_times or wall_times),
+            "samples": tuple(region_times or wall_times),
+            "cold_wall": _summary_stats(cold_wall_times),
+        }
+    
+    def _drop_caches(self):
+        """Flush dirty pages and drop the kernel's page, dentry and inode caches."""
+        subprocess.run(
+            self._privileged("sh", "-c", "sync && echo 3 > /proc/sys/vm/drop_caches"),
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_SPAWN_KW
+        )
     
     def measure_dram(self, target, args):
         """
@@ -140,21 +514,22 @@ class Benchmarker:
         Returns:
             Dictionary with READ/WRITE/TOTAL bytes, or None on failure
         """
-        cmd = ["sudo", "-n", str(target), *args, "--measure=dram"]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
+        if not self._can_elevate(str(target)):
             return None
         
+        cmd = self._privileged(str(target), *args, "--measure=dram")
+        
         data = {}
-        for line in result.stdout.split('\n'):
-            if 'DRAM_' in line and '=' in line:
-                key, value = line.split('=', 1)
-                data[key] = int(value)
+        
+        if self._run_streaming(cmd, _dram_parser(data), env=self._env)[0] != 0:
+            return None
         
         return data if data else None
     
+    def _has_pin(self):
+        """Return True if both PIN and the pintool are installed."""
+        return _exists(str(self.pin_path)) and _exists(str(self.pintool_path))
+    
     def measure_opcounts(self, target, args):
         """
         Measure integer operations using Intel PIN instrumentation.
@@ -166,29 +541,342 @@ class Benchmarker:
         Returns:
             Dictionary with operation counts, or None on failure
         """
-        cmd = [
-            "sudo", "-n",
+        if not (self._has_pin() and self._can_elevate(str(self.pin_path))):
+            return None
+        
+        cmd = self._privileged(
             str(self.pin_path),
             "-t", str(self.pintool_path),
             "--",
             str(target),
             *args,
             "--measure=pin"
-        ]
+        )
+        
+        # Keep only the lines spanning the JSON object, not the whole output
+        json_lines = []
+        
+        collect = _opcounts_collector(json_lines)
+        returncode, _ = self._run_streaming(
+            cmd, collect, env=self._env, timeout=self.pin_timeout
+        )
+        if returncode != 0:
+            return None
+        
+        return _decode_opcounts(json_lines)
+    
+    def measure_combined(self, target, args):
+        """
+        Measure DRAM traffic and operation counts in one PIN-instrumented run.
+        
+        Saves a full benchmark invocation per point, but the DRAM figures
+        then include traffic caused by PIN's instrumentation, so results
+        measured this way report no arithmetic intensity.
+        
+        Args:
+            target: Path to the executable
+            args: Command line arguments
+            
+        Returns:
+            Tuple of (dram, opcounts) dictionaries, each None on failure
+        """
+        if not (self._has_pin() and self._can_elevate(str(self.pin_path))):
+            return (None, None)
+        
+        cmd = self._privileged(
+            str(self.pin_path),
+            "-t", str(self.pintool_path),
+            "--",
+            str(target),
+            *args,
+            "--measure=dram+pin"
+        )
+        
+        dram = {}
+        json_lines = []
+        parse_dram = _dram_parser(dram)
+        collect_opcounts = _opcounts_collector(json_lines)
+        
+        def parse(line):
+            parse_dram(line)
+            collect_opcounts(line)
+        
+        returncode, _ = self._run_streaming(
+            cmd, parse, env=self._env, timeout=self.pin_timeout
+        )
+        if returncode != 0:
+            return (None, None)
+        
+        return (dram if dram else None, _decode_opcounts(json_lines))
+    
+    def measure_opcounts_perf(self, target, args):
+        """
+        Approximate operation counts with hardware counters via perf stat.
+        
+        Runs at near-native speed, unlike PIN, but counts retired
+        instructions for the whole process rather than only the region
+        between the PIN markers. Results therefore carry no arithmetic
+        intensity with this backend.
+        
+        Args:
+            target: Path to the executable
+            args: Command line arguments
+            
+        Returns:
+            Dictionary with per-event counts and "total" set to retired
+            instructions, or None on failure
+        """
+        if not (shutil.which("perf") and self._can_elevate("perf")):
+            return None
+        
+        cmd = self._privileged(
+            "perf", "stat",
+            "-x,",
+            "-e", ",".join(_PERF_EVENTS),
+            "--",
+            str(target),
+            *args,
+            "--measure=latency"
+        )
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # perf stat reports on stderr; the benchmark's own output is unused
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=self._env,
+            **_SPAWN_KW
+        )
         
         if result.returncode != 0:
             return None
         
-        json_match = re.search(r'\{[^}]+\}', result.stdout)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except (json.JSONDecodeError, ValueError):
-                pass
+        data = {}
+        for line in result.stderr.splitlines():
+            fields = line.split(",")
+            if len(fields) > 2 and fields[0].isdigit():
+                event = fields[2].split(":", 1)[0]
+                data[event] = int(fields[0])
         
-        return None
+        if "instructions" not in data:
+            return None
+        
+        data["total"] = data["instructions"]
+        return data
+    
+    def _count_operations(self, target, args):
+        """Measure operation counts with the configured counter backend."""
+        if self.counter_backend == "perf":
+            return self.measure_opcounts_perf(target, args)
+        return self.measure_opcounts(target, args)
+    
+    def _measure_counters(self, target, args, params):
+        """
+        Collect DRAM traffic and operation counts for one parameter point.
+        
+        Skipped entirely when counters is off, for latency-only sweeps.
+        With single_pass both come from one PIN run. With overlap_counters
+        the DRAM and op-count runs execute concurrently on disjoint halves
+        of the available CPUs; the uncore DRAM counters are socket-wide, so
+        the DRAM figures then include the other run's traffic and the
+        result reports no arithmetic intensity. Otherwise, with pin_cpus
+        the passes run on a fixed set of cores like the timed runs.
+        
+        Args:
+            target: Path to the executable
+            args: Command line arguments
+            params: Parameters of the run
+            
+        Returns:
+            Tuple of (dram, opcounts) dictionaries
+        """
+        if not params["counters"]:
+            return (None, None)
+        
+        if params["pin_cpus"] and not params["overlap_counters"]:
+            # A process migrating across sockets mid-run splits its traffic
+            # between memory controllers, so keep it where it started
+            cpus = _cpu_slices(self._cores_for(params["threads"]))[0]
+            unpinned = {**params, "pin_cpus": False}
+            return _call_on_cpus(cpus, self._measure_counters, target, args, unpinned)
+        
+        if params["single_pass"] and self.counter_backend == "pin":
+            return self.measure_combined(target, args)
+        
+        if self._overlaps_counters(params):
+            cpus = sorted(os.sched_getaffinity(0))
+            half = len(cpus) // 2
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                dram = pool.submit(_call_on_cpus, cpus[:half], self.measure_dram, target, args)
+                opcounts = pool.submit(
+                    _call_on_cpus, cpus[half:], self._count_operations, target, args
+                )
+                return (dram.result(), opcounts.result())
+        
+        return (self.measure_dram(target, args), self._count_operations(target, args))
+    
+    def _overlaps_counters(self, params):
+        """Return True if the DRAM and op-count passes of params run concurrently."""
+        return (params["overlap_counters"] and len(os.sched_getaffinity(0)) > 1
+                and self.sudo_ok)
+    
+    @cached_property
+    def sudo_ok(self):
+        """
+        Whether privileged measurements can run without a password prompt.
+        
+        Root needs no sudo at all. Otherwise sudo is probed once per
+        Benchmarker, and on success a background thread starts refreshing
+        its cached credentials, so a long sweep does not lose privileges
+        part-way through and silently drop its DRAM/PIN data. The thread
+        stops once this Benchmarker is garbage-collected.
+        
+        Sudoers that grant NOPASSWD only for specific programs, such as
+        pin and the benchmark binaries, fail that probe but still let sudo
+        list them; _can_elevate then checks each program before use.
+        """
+        if os.geteuid() == 0:
+            self._sudo_any = True
+            return True
+        
+        if shutil.which("sudo") is None:
+            return False
+        
+        if not self._sudo_succeeds("true"):
+            return self._sudo_succeeds("-l")
+        
+        self._sudo_any = True
+        self._sudo_keepalive = threading.Thread(
+            target=_refresh_sudo_ticket, args=(self._stop_keepalive,), daemon=True
+        )
+        self._sudo_keepalive.start()
+        return True
+    
+    def _can_elevate(self, program):
+        """
+        Whether program can run with privileges without a password prompt.
+        
+        Args:
+            program: Executable the privileged command starts
+            
+        Returns:
+            True if the command can run as root; the answer is probed at
+            most once per program
+        """
+        if not self.sudo_ok:
+            return False
+        if self._sudo_any:
+            return True
+        if program not in self._sudo_allows:
+            self._sudo_allows[program] = self._sudo_succeeds("-l", program)
+        return self._sudo_allows[program]
+    
+    def _sudo_succeeds(self, *args):
+        """Return True if non-interactive sudo with args exits successfully."""
+        return subprocess.run(
+            ["sudo", "-n", *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_SPAWN_KW
+        ).returncode == 0
+    
+    def _privileged(self, *cmd):
+        """
+        Prefix a command with non-interactive sudo unless already root.
+        
+        Callers check _can_elevate first so that missing privileges cost
+        one probe per program rather than a failed spawn per measurement.
+        
+        Args:
+            *cmd: Command line to run with elevated privileges
+            
+        Returns:
+            Command list ready for subprocess
+        """
+        if os.geteuid() == 0:
+            return list(cmd)
+        return ["sudo", "-n", *cmd]
+    
+    def _run_streaming(self, cmd, on_line, env=None, timeout=None):
+        """
+        Run a command, handing each line of stdout to a callback as it arrives.
+        
+        Output is parsed incrementally instead of being buffered in full,
+        so memory stays bounded even for long instrumented runs. Lines are
+        passed as raw bytes; only the few matched values are ever decoded.
+        In debug mode every line is also echoed to stdout as it arrives,
+        so long PIN runs can be followed live.
+        
+        Args:
+            cmd: Command line to execute
+            on_line: Callable invoked with every stdout line (bytes)
+            env: Environment for the child (default: inherit)
+            timeout: Seconds after which the child's process group is sent
+                SIGTERM, then SIGKILL if it is still running 10 seconds later
+            
+        Returns:
+            Tuple of (exit_code, resource_usage) for the process
+        """
+        # A process group of its own, but still in our session so sudo's
+        # tty-scoped credentials keep matching the probed ticket. Only
+        # deadline runs need one; before Python 3.11 it takes a preexec_fn.
+        group_kw = {}
+        if timeout is not None:
+            if sys.version_info >= (3, 11):
+                group_kw = {"process_group": 0}
+            else:
+                group_kw = {"preexec_fn": os.setpgrp}
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=None if self._debug else subprocess.DEVNULL,
+            env=env,
+            **group_kw,
+            **_SPAWN_KW
+        )
+        
+        # Signal the whole group so helpers holding stdout open go too;
+        # SIGTERM first, which sudo relays to the command it runs. This
+        # bypasses Popen's methods, which would poll and could reap the
+        # child before wait4 collects its rusage.
+        timers = []
+        if timeout is not None:
+            timers = [
+                threading.Timer(timeout, _signal_group, (proc.pid, signal.SIGTERM)),
+                threading.Timer(timeout + 10, _signal_group, (proc.pid, signal.SIGKILL)),
+            ]
+            for timer in timers:
+                timer.daemon = True
+                timer.start()
+        
+        try:
+            with proc.stdout:
+                for line in proc.stdout:
+                    if self._debug:
+                        sys.stdout.buffer.write(line)
+                        sys.stdout.buffer.flush()
+                    on_line(line)
+        except BaseException:
+            if timeout is None:
+                proc.kill()
+            else:
+                # The group does not see the terminal's Ctrl-C, and SIGKILL
+                # to sudo is not relayed, so stop the group the same way
+                _signal_group(proc.pid, signal.SIGTERM)
+                try:
+                    proc.wait(10)
+                except subprocess.TimeoutExpired:
+                    _signal_group(proc.pid, signal.SIGKILL)
+            proc.wait()
+            raise
+        finally:
+            for timer in timers:
+                timer.cancel()
+        
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return (proc.returncode, usage)
     
     def run(self, benchmark, **kwargs):
         """
@@ -201,30 +889,215 @@ class Benchmarker:
         Returns:
             Dictionary containing all measurement results and computed metrics
         """
-        params = self.base_config.copy()
-        params.update(kwargs)
-        params["debug"] = self._debug
-            
-        # Validate ring dimension
-        if params["ring_dim"] < 16:
-            raise ValueError(f"Ring dimension must be at least 16, got {params['ring_dim']}")
+        params = self._resolve_params(kwargs)
+        
+        error = _parameter_error(params)
+        if error:
+            raise ValueError(error)
         
         if params["build"]:
-            clean = params.get("clean_build", False)
-            target = self.build(benchmark, clean=clean)
+            target = self.build(benchmark, clean=params.get("clean_build", False))
         else:
             target = self.build_dir / benchmark
         
         args = self._prepare_arguments(params)
         
-        latency = self.measure_latency(target, args, params["timing_runs"])
-        dram = self.measure_dram(target, args)
-        opcounts = self.measure_opcounts(target, args)
+        timing_args = (
+            target, args, params["timing_runs"], params["warmup_runs"],
+            params["drop_caches"], params["early_stop_cv"]
+        )
+        if params["pin_cpus"]:
+            timing = _call_on_cpus(
+                _cpu_slices(self._cores_for(params["threads"]))[0],
+                self.measure_timing, *timing_args
+            )
+        else:
+            timing = self.measure_timing(*timing_args)
+        dram, opcounts = self._measure_counters(target, args, params)
+        
+        return self._summarize(benchmark, params, timing, dram, opcounts)
+    
+    def sweep(self, benchmark, param_sets, workers=1):
+        """
+        Run a benchmark over several parameter sets, building it only once.
+        
+        Latency runs of independent points may optionally execute
+        concurrently; DRAM and PIN measurements always stay serial because
+        the uncore counters and sudo are shared, machine-wide resources.
+        
+        Args:
+            benchmark: Name of the benchmark to run
+            param_sets: Iterable of override dictionaries, one per point
+            workers: Number of concurrent latency runs, or None for as many
+                as the available cores allow. The default of 1 times points
+                one at a time: concurrent memory-bound runs share DRAM
+                bandwidth and LLC, which changes the latency measured.
+                Points with drop_caches always run one at a time
+            
+        Returns:
+            List of result dictionaries in the order of param_sets; points
+            with parameters OpenFHE would reject are skipped and reported
+            with success set to False and the reason in error
+        """
+        return self._run_points(
+            [(benchmark, self._resolve_params(p)) for p in param_sets], workers
+        )
+    
+    def run_all(self, benchmarks, workers=1, **kwargs):
+        """
+        Run several benchmarks with the same parameters.
+        
+        Each benchmark is built once up front; their latency runs can then
+        overlap as in sweep(), with DRAM and PIN measurements kept serial.
+        
+        Args:
+            benchmarks: Iterable of benchmark names
+            workers: Number of concurrent latency runs, or None for as many
+                as the available cores allow (default: 1, no overlap);
+                ignored when drop_caches is set
+            **kwargs: Override parameters for every run
+            
+        Returns:
+            List of result dictionaries in the order of benchmarks
+        """
+        params = self._resolve_params(kwargs)
+        return self._run_points([(name, params) for name in benchmarks], workers)
+    
+    def _run_points(self, points, workers):
+        """
+        Measure (benchmark, params) points, overlapping their latency runs.
         
-        success = latency[0] is not None
+        Args:
+            points: List of (benchmark, params) tuples with resolved params
+            workers: Number of concurrent latency runs, or None for as many
+                as the available cores allow for the requested threads
+            
+        Returns:
+            List of result dictionaries in the order of points
+        """
+        # Parameter sets OpenFHE would reject are reported, not executed
+        no_timing = {
+            **dict.fromkeys(("region", "wall", "cpu", "median", "cold_wall"), (None, None)),
+            "samples": (),
+        }
+        results = [
+            self._summarize(name, p, no_timing, None, None, _parameter_error(p))
+            for name, p in points
+        ]
+        runnable = [i for i, result in enumerate(results) if result["error"] is None]
+        if not runnable:
+            return results
         
+        # Build each benchmark at most once, honoring build and clean_build
+        # as run() does: if any of its points asks for it
+        build_flags = {}
+        for i in runnable:
+            name, params = points[i]
+            build, clean = build_flags.get(name, (False, False))
+            build_flags[name] = (
+                build or params["build"],
+                clean or (params["build"] and params.get("clean_build", False)),
+            )
+        targets = {
+            name: self.build(name, clean=clean) if build else self.build_dir / name
+            for name, (build, clean) in build_flags.items()
+        }
+        point_args = {i: self._prepare_arguments(points[i][1]) for i in runnable}
+        
+        cores_per_run = max(self._cores_for(points[i][1]["threads"]) for i in runnable)
+        if workers is None:
+            workers = max(1, min(len(runnable), self._ncpu // cores_per_run))
+        
+        # Dropping the page cache is machine-wide and would evict the files
+        # of concurrent runs mid-measurement, so such points run one at a time
+        if any(points[i][1]["drop_caches"] for i in runnable):
+            workers = 1
+        
+        # With pin_cpus each concurrent run borrows its own disjoint set of cores
+        free_cpus = None
+        if any(points[i][1]["pin_cpus"] for i in runnable):
+            free_cpus = queue.SimpleQueue()
+            slices = _cpu_slices(cores_per_run)
+            for cpus in slices:
+                free_cpus.put(cpus)
+            workers = min(workers, len(slices))
+        
+        def measure(i):
+            name, params = points[i]
+            timing_args = (
+                targets[name], point_args[i], params["timing_runs"],
+                params["warmup_runs"], params["drop_caches"], params["early_stop_cv"]
+            )
+            if not params["pin_cpus"]:
+                return self.measure_timing(*timing_args)
+            cpus = free_cpus.get()
+            try:
+                return _call_on_cpus(cpus, self.measure_timing, *timing_args)
+            finally:
+                free_cpus.put(cpus)
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            timings = list(pool.map(measure, runnable))
+        
+        for i, timing in zip(runnable, timings):
+            (name, params), args = points[i], point_args[i]
+            dram, opcounts = self._measure_counters(targets[name], args, params)
+            results[i] = self._summarize(name, params, timing, dram, opcounts)
+        
+        return results
+    
+    def _cores_for(self, threads):
+        """
+        Return how many cores a run with the given thread count occupies.
+        
+        Args:
+            threads: The threads parameter; 0 or less leaves the count to
+                OpenMP, which then uses every available core
+            
+        Returns:
+            Number of cores to reserve for the run
+        """
+        return threads if threads > 0 else self._ncpu
+    
+    def _resolve_params(self, overrides):
+        """
+        Merge per-run overrides into the base configuration.
+        
+        Args:
+            overrides: Dictionary of parameters overriding base_config
+            
+        Returns:
+            Complete parameter dictionary for one run
+        """
+        params = self.base_config.copy()
+        params.update(overrides)
+        params["debug"] = self._debug
+        return params
+    
+    def _summarize(self, benchmark, params, timing, dram, opcounts, error=None):
+        """
+        Combine raw measurements into a result dictionary.
+        
+        Args:
+            benchmark: Name of the benchmark
+            params: Parameters the benchmark was run with
+            timing: Dictionary returned by measure_timing
+            dram: Dictionary returned by measure_dram
+            opcounts: Dictionary returned by measure_opcounts
+            error: Why the point was skipped without running, or None
+            
+        Returns:
+            Dictionary containing all measurement results and computed metrics
+        """
+        latency = _latency(timing)
+        success = timing["wall"][0] is not None
+        
+        # perf counts the whole process while DRAM covers only the measured
+        # region, and single_pass or overlapped DRAM figures include PIN's
+        # traffic, so none of those ratios is an arithmetic intensity
         ai = None
-        if dram and opcounts:
+        if (dram and opcounts and self.counter_backend == "pin"
+                and not params["single_pass"] and not self._overlaps_counters(params)):
             total_bytes = dram.get("DRAM_TOTAL_BYTES", 0)
             total_ops = opcounts.get("total", 0)
             if total_bytes > 0:
@@ -235,9 +1108,15 @@ class Benchmarker:
             "parameters": params,
             "success": success,
             "latency": latency,
+            "latency_median": timing["median"],
+            "latency_samples": timing["samples"],
+            "wall_time": timing["wall"],
+            "cold_wall_time": timing["cold_wall"],
+            "cpu_time": timing["cpu"],
             "dram": dram,
             "opcounts": opcounts,
-            "ai": ai
+            "ai": ai,
+            "error": error
         }
     
     def _prepare_arguments(self, params):
@@ -250,7 +1129,11 @@ class Benchmarker:
         Returns:
             List of command line argument strings
         """
-        skip_keys = {"timing_runs", "build", "num_limbs", "clean_build"}
+        skip_keys = {
+            "timing_runs", "warmup_runs", "drop_caches", "early_stop_cv",
+            "build", "num_limbs", "clean_build", "single_pass",
+            "overlap_counters", "pin_cpus", "counters",
+        }
         
         args = []
         
@@ -258,12 +1141,10 @@ class Benchmarker:
             mult_depth = params["num_limbs"] - 1
             args.append(f"--mult-depth={mult_depth}")
         
-        for key, value in params.items():
-            if key not in skip_keys and not key.startswith("_"):
-                arg_name = key.replace("_", "-")
-                if isinstance(value, bool):
-                    args.append(f"--{arg_name}={'true' if value else 'false'}")
-                else:
-                    args.append(f"--{arg_name}={value}")
+        args.extend(
+            f"--{key.replace('_', '-')}={_format_arg_value(value)}"
+            for key, value in params.items()
+            if key not in skip_keys and not key.startswith("_")
+        )
         
-        return args
\ No newline at end of file
+        return args